@@ -1,9 +1,9 @@
+import functools
 import logging
 
 from typing import Any, Dict, Optional, Callable
 
 from mcp.server.fastmcp import FastMCP
-from kipy import KiCad
 from .mcp_manager import ToolManager
 
 logger = logging.getLogger(__name__)
@@ -15,28 +15,25 @@ class ActionFlowManager(ToolManager):
         self.action_flow = []  # Initialize action flow as a list
         self.mcp_tools = {}  # Store registered MCP tools
         self.flow_graph = {}  # Flow graph (information about the next function to execute)
+        self._action_index: Dict[str, int] = {}  # Position of each action in action_flow
+        self._next_action_info: Dict[str, tuple] = {}  # {action: (next_action, next_action_info)} for responses
         
         
-    def initialize_board(self):
-        # TODO: Need to add logic to refresh the board.
-        try:
-            self.board = KiCad().get_board()
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize the board: {str(e)}")
-
-
     def get_next_action(self, current_action: str) -> Optional[str]:
         """Returns the action to be executed after the current action"""
-        try:
-            current_index = self.action_flow.index(current_action)
-            if current_index + 1 < len(self.action_flow):
-                return self.action_flow[current_index + 1]
-            return None
-        except ValueError:
-            return None
+        current_index = self._action_index.get(current_action)
+        if current_index is not None and current_index + 1 < len(self.action_flow):
+            return self.action_flow[current_index + 1]
+        return None
 
-    def response_formatter(self, result: Any, status: str = 'success', error_type: Optional[str] = None) -> Dict[str, Any]:
-        """Formats and returns the result"""
+    def response_formatter(
+        self, 
+        result: Any, 
+        status: str = 'success', 
+        error_type: Optional[str] = None, 
+        action: Optional[str] = None
+        ) -> Dict[str, Any]:
+        """Formats and returns the result of action, pointing at the action that follows it"""
         if status == 'error':
             return {
                 "result": result,
@@ -44,25 +41,38 @@ class ActionFlowManager(ToolManager):
                 "error_type": error_type
             }
         else:
-            next_action = self.get_next_action(self.action_flow[-1]) if self.action_flow else None
+            next_action, next_action_info = self._next_action_info.get(action, (None, "Flow complete"))
             return {
                 "result": result,
                 "status": status,
                 "next_action": next_action,
-                "next_action_info": f"Next execution: {next_action}" if next_action else "Flow complete"
+                "next_action_info": next_action_info
             }
     
     
-    def action_setter(self, func: Callable[..., Any]):
+    def action_setter(self, func: Callable[..., Any], requires_board: bool = True):
         """
         A function that adds a method to the action_flow list and registers it as an MCP tool.
         The registered function formats the result through self.response_formatter upon execution.
+        Steps that only return static type information pass requires_board=False.
         """
-        self.action_flow.append(func.__name__)
-        self.add_tool(func)
+        action = func.__name__
+        if self.action_flow:
+            # The flow only grows here, so each step's response suffix is computed once,
+            # when the step after it is registered.
+            previous_action = self.action_flow[-1]
+            self._next_action_info[previous_action] = (action, f"Next execution: {action}")
+        self.action_flow.append(action)
+        self._action_index[action] = len(self.action_flow) - 1
+        self._next_action_info[action] = (None, "Flow complete")
+        self.add_tool(
+            func, 
+            requires_board=requires_board, 
+            response_formatter=functools.partial(self.response_formatter, action=action)
+        )
         
         # Store in the MCP tool dictionary
-        self.mcp_tools[func.__name__] = func
+        self.mcp_tools[action] = func
         
     
     def get_mcp_tools(self) -> Dict[str, Callable]:
@@ -1,12 +1,79 @@
+import contextlib
+import functools
 import inspect
+import threading
 
-from typing import Any, Optional, get_origin, Dict
+from typing import Any, Callable, Optional, get_origin, Dict
+
+import anyio
 
 from mcp.server.fastmcp import FastMCP, Context
 from mcp.types import AnyFunction, Resource
 from mcp.server.fastmcp.tools.base import Tool, func_metadata
 
 
+@functools.cache
+def _context_kwarg_for(func: AnyFunction) -> Optional[str]:
+    """
+    Returns the name of the parameter annotated with Context, if any.
+    """
+    sig = inspect.signature(func)
+    for param_name, param in sig.parameters.items():
+        if get_origin(param.annotation) is not None:
+            continue
+        if issubclass(param.annotation, Context):
+            return param_name
+    return None
+
+
+# {(module, qualname, context_kwarg): (func_arg_metadata, parameters)}
+_TOOL_METADATA_CACHE: Dict[tuple, tuple] = {}
+
+
+def _tool_metadata(func: AnyFunction, context_kwarg: Optional[str]):
+    """
+    Returns the argument metadata and JSON schema of a tool function.
+    Results are shared by every instance registering the same method,
+    e.g. when register_tools runs more than once.
+    """
+    key = (func.__module__, func.__qualname__, context_kwarg)
+    cached = _TOOL_METADATA_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    func_arg_metadata = func_metadata(
+        func,
+        skip_names=[context_kwarg] if context_kwarg is not None else [],
+    )
+    result = (func_arg_metadata, func_arg_metadata.arg_model.model_json_schema())
+    # Local functions and lambdas can share a qualname, so they are not cached.
+    if '<' not in func.__qualname__:
+        _TOOL_METADATA_CACHE[key] = result
+    return result
+
+
+# {id(mcp): {tool_name: Tool}} for registrations inside batch_tool_registration.
+_PENDING_TOOLS: Dict[int, Dict[str, Tool]] = {}
+
+
+@contextlib.contextmanager
+def batch_tool_registration(mcp: FastMCP):
+    """
+    Collects the tools added inside the block and registers them with a single update.
+    Nothing is registered if the block raises.
+    """
+    if id(mcp) in _PENDING_TOOLS:
+        # Already batching for this server; the outer block registers everything.
+        yield
+        return
+
+    pending = _PENDING_TOOLS[id(mcp)] = {}
+    try:
+        yield
+    finally:
+        del _PENDING_TOOLS[id(mcp)]
+    mcp._tool_manager._tools.update(pending)
+
 
 class ResourceManager:
     """
@@ -42,6 +109,10 @@ class ToolManager:
     Represents a tool with its properties and methods.
     """
 
+    # All managers share one KiCad client (see pcbmodule), whose socket
+    # can't carry concurrent requests, so tool bodies are serialized.
+    _kicad_lock = threading.Lock()
+
     def __init__(self, mcp: FastMCP):
         self.mcp = mcp
 
@@ -55,40 +126,81 @@ class ToolManager:
         return result # init function, will be use in ActionFlowmanager
 
 
-    def add_tool(self, func: AnyFunction):
+    async def run_locked(self, func: AnyFunction, *args: Any) -> Any:
+        """
+        Runs a blocking KiCad call from an async tool, in a worker thread and under the KiCad lock.
+        """
+        def locked_call():
+            with self._kicad_lock:
+                return func(*args)
+
+        return await anyio.to_thread.run_sync(locked_call)
+
+
+    def add_tool(
+        self, 
+        func: AnyFunction, 
+        requires_board: bool = True, 
+        response_formatter: Optional[Callable[..., Any]] = None
+        ):
         """
         Adds a tool to the MCP with its function name and documentation.
+        Tools registered with requires_board=False don't touch KiCad,
+        so they skip board initialization and the KiCad lock.
+        When a tool that uses the board fails, discard_stale_board decides
+        whether the cached board handle is dropped.
+        Async tools run on the event loop once the board is initialized and
+        take the KiCad lock themselves, through run_locked, only where they need it.
+        Results go through response_formatter, self.response_formatter by default.
         """
+        format_response = response_formatter or self.response_formatter
         try:
 
-            def initialize_func(*args, **kwargs):
-                """
-                A wrapper function that calls the original function and formats the result.
-                """
-                self.initialize_kicad() 
+            def call_func(*args, **kwargs):
                 try:
                     result = func(*args, **kwargs)
-                    return self.response_formatter(result)
+                    return format_response(result)
+                except Exception as e:
+                    if requires_board:
+                        self.discard_stale_board(e)
+                    return format_response(str(e), status='error', error_type=type(e).__name__)
+
+            def run_tool(*args, **kwargs):
+                if not requires_board:
+                    return call_func(*args, **kwargs)
+                with self._kicad_lock:
+                    self.initialize_kicad()
+                    return call_func(*args, **kwargs)
+
+            async def run_async_tool(*args, **kwargs):
+                if requires_board:
+                    await self.run_locked(self.initialize_kicad)
+                try:
+                    result = await func(*args, **kwargs)
+                    return format_response(result)
                 except Exception as e:
-                    return self.response_formatter(str(e), status='error', error_type=type(e).__name__)
+                    if requires_board:
+                        await self.run_locked(self.discard_stale_board, e)
+                    return format_response(str(e), status='error', error_type=type(e).__name__)
+
+            is_async = inspect.iscoroutinefunction(func)
+
+            async def initialize_func(*args, **kwargs):
+                """
+                A wrapper function that calls the original function and formats the result.
+                Sync tools run in a worker thread so blocking KiCad IPC and CLI work
+                doesn't stall the event loop.
+                """
+                if is_async:
+                    return await run_async_tool(*args, **kwargs)
+                return await anyio.to_thread.run_sync(functools.partial(run_tool, *args, **kwargs))
             
             # https://github.com/modelcontextprotocol/python-sdk/blob/main/src/mcp/server/fastmcp/tools/base.py#L40
             # The reason for directly using Tool.from_function to register the MCP tool
             # is because context_kwarg is required.
-            context_kwarg = None
-            sig = inspect.signature(func)
-            for param_name, param in sig.parameters.items():
-                if get_origin(param.annotation) is not None:
-                    continue
-                if issubclass(param.annotation, Context):
-                    context_kwarg = param_name
-                    break
-                
-            func_arg_metadata = func_metadata(
-                func,
-                skip_names=[context_kwarg] if context_kwarg is not None else [],
-            )
-            parameters = func_arg_metadata.arg_model.model_json_schema()
+            # Both lookups are cached, so each function is introspected only once.
+            context_kwarg = _context_kwarg_for(getattr(func, '__func__', func))
+            func_arg_metadata, parameters = _tool_metadata(func, context_kwarg)
 
             tool = Tool(
                 fn=initialize_func,
@@ -97,11 +209,15 @@ class ToolManager:
                 description=func.__doc__,
                 parameters=parameters,
                 fn_metadata=func_arg_metadata,
-                is_async=False,
+                is_async=True,
                 context_kwarg=context_kwarg,
                 annotations=None,
             )
-            self.mcp._tool_manager._tools[tool.name] = tool
+            pending = _PENDING_TOOLS.get(id(self.mcp))
+            if pending is not None:
+                pending[tool.name] = tool
+            else:
+                self.mcp._tool_manager._tools[tool.name] = tool
             
             
         except Exception as e:
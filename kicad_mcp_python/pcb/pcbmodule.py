@@ -1,5 +1,39 @@
 from mcp.server.fastmcp import FastMCP
 from kipy import KiCad
+from kipy.errors import ApiError, ConnectionError as KiCadConnectionError
+
+from ..utils.convert_proto import get_object_type
+
+
+# The KiCad client and board handle are shared by every tool.
+# The board is fetched again after a mutating operation bumps "rev",
+# or after a tool fails on a KiCad error (see discard_stale_board).
+_KICAD_CLIENT = None
+_BOARD_CACHE = {"board": None, "rev": 0, "board_rev": None}
+
+
+def invalidate_board():
+    """Marks the cached board as stale. Call after create/update/remove operations."""
+    _BOARD_CACHE["rev"] += 1
+
+
+def drop_board(drop_client=False):
+    """
+    Forgets the cached board handle, and with drop_client the KiCad client too,
+    so the next tool call fetches them again.
+    """
+    global _KICAD_CLIENT
+    if drop_client:
+        _KICAD_CLIENT = None
+    _BOARD_CACHE["board"] = None
+
+
+def get_item_index(board, item_type):
+    """
+    Returns a {item_id: item} dict for the given item type, read from KiCad on every call.
+    """
+    return {item.id.value: item for item in board.get_items(get_object_type(item_type))}
+
 
 class PCBTool:
     """
@@ -7,8 +41,27 @@ class PCBTool:
     """
 
     def initialize_kicad(self):
-        # TODO: Need to add logic to refresh the board.
+        global _KICAD_CLIENT
         try:
-            self.board = KiCad().get_board()
+            if _KICAD_CLIENT is None:
+                _KICAD_CLIENT = KiCad()
+            if _BOARD_CACHE["board"] is None or _BOARD_CACHE["board_rev"] != _BOARD_CACHE["rev"]:
+                _BOARD_CACHE["board"] = _KICAD_CLIENT.get_board()
+                _BOARD_CACHE["board_rev"] = _BOARD_CACHE["rev"]
+            self.board = _BOARD_CACHE["board"]
         except Exception as e:
+            # Drop the cached connection so the next call reconnects from scratch.
+            drop_board(drop_client=True)
             raise RuntimeError(f"Failed to initialize the board: {str(e)}")
+
+    def discard_stale_board(self, error):
+        """
+        Called when a tool that uses the board fails.
+        The cached handle goes stale when the board is closed or switched, or KiCad restarts,
+        which surfaces as an ApiError or a connection error; the handle is then dropped
+        so the next call fetches the open board instead of failing on the old one.
+        """
+        if isinstance(error, (KiCadConnectionError, ConnectionError)):
+            drop_board(drop_client=True)
+        elif isinstance(error, ApiError):
+            drop_board()
@@ -1,20 +1,34 @@
-from dotenv import load_dotenv
+import os
+from collections import OrderedDict
 
+import anyio
 
+
+from ...utils import preview_cache
+from ...utils.b64 import b64encode_as_string
 from ...utils.convert_proto import (
     BOARDITEM_TYPE_CONFIGS, 
+    BOARDITEM_TYPES,
+    get_proto_class,
     get_object_type
 )
 
-from ..pcbmodule import PCBTool
-from ...core.mcp_manager import ToolManager
-
-from ...utils.kicad_cli import KiCadPCBConverter
+from ..pcbmodule import PCBTool, get_item_index
+from ...core.mcp_manager import ToolManager, batch_tool_registration
 
 from mcp.server.fastmcp import FastMCP
-from mcp.types import ImageContent
+from mcp.types import ImageContent, TextContent
+
 
-load_dotenv()
+# Item types that have a KiCad object type, keyed by the proto class their items come back as.
+_FETCHABLE_TYPES_BY_PROTO = {
+    get_proto_class(item_type): item_type
+    for item_type in BOARDITEM_TYPES
+    if get_object_type(item_type) is not None
+}
+
+# Number of rendered board previews kept by BoardAnalyzer.
+_RENDER_CACHE_SIZE = 8
 
 
 class BoardAnalyzer(ToolManager, PCBTool):
@@ -24,47 +38,230 @@ class BoardAnalyzer(ToolManager, PCBTool):
 
     def __init__(self, mcp: FastMCP):
         super().__init__(mcp)
-        self.pcb_converter = KiCadPCBConverter()
+        self._pcb_converter = None  # Created on first use, see pcb_converter
+        self._render_cache = OrderedDict()  # {(pcb_path, layers, mtime_ns, size): ImageContent}
         self.add_tool(self.get_board_status)        
+        self.add_tool(self.get_board_images, requires_board=False)        
         self.add_tool(self.get_items_by_type)        
-        self.add_tool(self.get_item_type_args_hint)        
+        self.add_tool(self.get_item_type_args_hint, requires_board=False)        
         
             
-    def get_board_status(self):
+    @property
+    def pcb_converter(self):
+        '''
+        The KiCadPCBConverter, created on the first render.
+        Servers that never render a board don't import the rasterizer, load .env
+        or look up kicad-cli, and a missing KICAD_CLI_PATH only fails the tools that need it.
+        '''
+        if self._pcb_converter is None:
+            from ...utils.kicad_cli import KiCadPCBConverter
+            self._pcb_converter = KiCadPCBConverter.instance()
+        return self._pcb_converter
+    
+    
+    async def get_board_status(self, inline: bool = True):
         '''
         Retrieves the comprehensive status of the current PCB board including all components and visual representation.
         
         This method collects information about all board items (footprints, tracks, vias, pads, etc.) 
         and generates a visual representation of the current board state.
         
+        Args:
+            inline (bool): Return the image inline as base64 (default). Clients that share
+                the server's filesystem should pass False to receive the path of the JPEG
+                instead, which skips the base64 payload entirely.
         Returns:
             list: A two-element list containing:
                 - dict: Dictionary with board item types as keys and lists of items as values.
                     Failed item types will have error messages instead of item lists.
                 - ImageContent: JPEG image representation of the current board layout
                             generated via SVG conversion.
+                  With inline=False, a TextContent with the JPEG's path and file:// URL.
         
         Raises:
             Exception: May raise exceptions during board item retrieval or image conversion,
                     which are caught and reported in the result dictionary.
         
         '''
+        # Only the item queries go through the KiCad client; the render runs
+        # kicad-cli on the saved file, so other tools may use KiCad meanwhile.
+        result = await self.run_locked(self._get_board_items)
+        if inline:
+            image = await self._render_board(boardname=self.board.name)
+        else:
+            image = await self._save_board_preview(boardname=self.board.name)
+        return [result, image]
+    
+    
+    def _get_board_items(self):
+        grouped_items = self._get_items_grouped_by_type()
         result = {}
-        for item_type in BOARDITEM_TYPE_CONFIGS.keys():
+        first_error = None
+        for item_type in BOARDITEM_TYPES:
+            if item_type in grouped_items:
+                result[item_type] = grouped_items[item_type]
+                continue
+            object_type = get_object_type(item_type)
             try:
-                result[item_type] = [item for item in self.board.get_items(get_object_type(item_type))]
+                result[item_type] = list(self.board.get_items(object_type))
             except Exception as e:
+                first_error = first_error or e
                 result[item_type] = f'Not yet implemented, {str(e)}'
-                
-        base64_image = self.pcb_converter.pcb_to_jpg_via_svg(
-            boardname=self.board.name,
-            )
+        if not grouped_items and all(isinstance(items, str) for items in result.values()):
+            # Not a single type could be read, so the board itself is unreachable
+            # (closed, switched or KiCad restarted); fail so the handle is refetched.
+            raise first_error
+        return result
+    
+    
+    def get_board_images(self, boardnames: list[str]):
+        '''
+        Renders several saved boards at once, e.g. to compare revisions of a design.
+        Boards found in the preview cache are not rendered again; the rest are
+        exported and rasterized in parallel, one process per board.
         
-        return [result, ImageContent(
+        Args:
+            boardnames (list[str]): Board file names (e.g., 'my_board.kicad_pcb') listed in PCB_PATHS
+        Returns:
+            list: ImageContent JPEG images, in the order of boardnames.
+        '''
+        jpg_by_board = {}
+        pending = {}  # {boardname: (disk_key, pcb_path, fingerprint)} for boards that can be cached
+        misses = []
+        renderer = self.pcb_converter.cli_identity()
+        for boardname in dict.fromkeys(boardnames):
+            pcb_path = self.pcb_converter.get_pcb_path_by_name(boardname)
+            if pcb_path is not None and os.path.exists(pcb_path):
+                stat = os.stat(pcb_path)
+                disk_key = preview_cache.preview_key(pcb_path, renderer=renderer)
+                jpg_data = preview_cache.get(disk_key)
+                if jpg_data is not None:
+                    jpg_by_board[boardname] = jpg_data
+                    continue
+                pending[boardname] = (disk_key, pcb_path, (stat.st_mtime_ns, stat.st_size))
+            misses.append(boardname)
+
+        for boardname, jpg_data in zip(misses, self.pcb_converter.pcb_to_jpg_many(misses)):
+            jpg_by_board[boardname] = jpg_data
+            if boardname in pending:
+                disk_key, pcb_path, fingerprint = pending[boardname]
+                # Skip storing a render of a file that was saved again while rendering.
+                stat = os.stat(pcb_path)
+                if (stat.st_mtime_ns, stat.st_size) == fingerprint:
+                    preview_cache.put(disk_key, jpg_data)
+
+        return [self._to_image_content(jpg_by_board[boardname]) for boardname in boardnames]
+    
+    
+    def _get_items_grouped_by_type(self):
+        '''
+        Fetches the items of every fetchable type with a single GetItems request
+        and groups them by item type. Returns an empty dict if the request fails,
+        in which case the caller falls back to one request per type.
+        KiCad silently skips the types it doesn't serve as long as one requested type
+        is valid, so only types that came back with items are returned; the caller
+        queries the others on their own, which tells "no items" from "not supported".
+        '''
+        try:
+            items = self.board.get_items(
+                [get_object_type(item_type) for item_type in _FETCHABLE_TYPES_BY_PROTO.values()]
+            )
+        except Exception:
+            return {}
+
+        grouped_items = {}
+        for item in items:
+            item_type = _FETCHABLE_TYPES_BY_PROTO.get(type(item.proto))
+            if item_type is not None:
+                grouped_items.setdefault(item_type, []).append(item)
+        return grouped_items
+    
+    
+    async def _render_board(self, boardname, layers=None):
+        '''
+        Renders the board through pcb_converter and returns it as ImageContent.
+        The image is reused while the saved board file is unchanged; the last
+        _RENDER_CACHE_SIZE previews are kept in memory, least recently used first out,
+        on top of the disk cache in utils.preview_cache.
+        '''
+        pcb_path = self.pcb_converter.get_pcb_path_by_name(boardname)
+        if pcb_path is None or not os.path.exists(pcb_path):
+            return self._to_image_content(
+                await self.pcb_converter.pcb_to_jpg_bytes_async(boardname=boardname, layers=layers)
+            )
+
+        # kicad-cli renders the saved file, so the file fingerprint alone decides
+        # whether the image is stale; edits made over IPC don't show up until saved.
+        # Layer order is kept since it sets the drawing order.
+        stat = os.stat(pcb_path)
+        key = (pcb_path, tuple(layers) if layers else None, stat.st_mtime_ns, stat.st_size)
+        image = self._render_cache.get(key)
+        if image is not None:
+            self._render_cache.move_to_end(key)
+            return image
+
+        jpg_data, _ = await self._render_board_jpg(boardname, pcb_path, layers, key[2:])
+        image = self._to_image_content(jpg_data)
+        self._render_cache[key] = image
+        if len(self._render_cache) > _RENDER_CACHE_SIZE:
+            self._render_cache.popitem(last=False)
+        return image
+    
+    
+    async def _save_board_preview(self, boardname, layers=None):
+        '''
+        Renders the board into the preview cache directory and returns a
+        TextContent pointing at the JPEG, for clients that read it from disk.
+        '''
+        pcb_path = self.pcb_converter.get_pcb_path_by_name(boardname)
+        if pcb_path is None or not os.path.exists(pcb_path):
+            raise FileNotFoundError(f"Board file of '{boardname}' not found, please write correct path in .env")
+
+        stat = os.stat(pcb_path)
+        jpg_data, jpg_path = await self._render_board_jpg(
+            boardname, pcb_path, layers, (stat.st_mtime_ns, stat.st_size)
+        )
+        if jpg_path is None:
+            jpg_path = await anyio.to_thread.run_sync(preview_cache.put_temporary, jpg_data)
+        jpg_path = jpg_path.absolute()
+        return TextContent(
+            type="text",
+            text=f"Board image (image/jpeg) saved to {jpg_path}\n{jpg_path.as_uri()}"
+        )
+    
+    
+    async def _render_board_jpg(self, boardname, pcb_path, layers, fingerprint):
+        '''
+        Returns (jpg_data, jpg_path) for the board, going through the disk cache in utils.preview_cache.
+        jpg_path is None when the render could not be stored there.
+        fingerprint is the (st_mtime_ns, st_size) of pcb_path seen before rendering.
+        '''
+        # Previews also persist on disk, keyed by the board contents, so they
+        # survive restarts and are shared by identical copies of a board.
+        disk_key = await anyio.to_thread.run_sync(
+            preview_cache.preview_key, pcb_path, layers, self.pcb_converter.cli_identity()
+        )
+        jpg_data = await anyio.to_thread.run_sync(preview_cache.get, disk_key)
+        if jpg_data is not None:
+            return jpg_data, preview_cache.path_for(disk_key)
+
+        jpg_data = await self.pcb_converter.pcb_to_jpg_bytes_async(boardname=boardname, layers=layers)
+        # Skip storing a render of a file that was saved again while hashing or rendering.
+        stat = os.stat(pcb_path)
+        if (stat.st_mtime_ns, stat.st_size) == fingerprint:
+            if await anyio.to_thread.run_sync(preview_cache.put, disk_key, jpg_data):
+                return jpg_data, preview_cache.path_for(disk_key)
+        return jpg_data, None
+    
+    
+    @staticmethod
+    def _to_image_content(jpg_data):
+        # ImageContent.data is a base64 str; this is the only place the JPEG gets encoded.
+        return ImageContent(
             type="image",
-            data=base64_image,
+            data=b64encode_as_string(jpg_data),
             mimeType="image/jpeg"
-        )]
+        )
     
     
     def get_items_by_type(self, item_type: str):
@@ -78,10 +275,7 @@ class BoardAnalyzer(ToolManager, PCBTool):
             dict: A dictionary containing the list of items of the specified type.
         '''
         
-        result = {
-            item.id.value:item for item in self.board.get_items(
-            get_object_type(item_type)
-            )}
+        result = get_item_index(self.board, item_type)
         return result
     
     
@@ -111,5 +305,6 @@ class AnalyzeTools:
             mcp (FastMCP): The MCP instance to register the tools with.
         '''
         # Register board analyzer
-        BoardAnalyzer(mcp)
+        with batch_tool_registration(mcp):
+            BoardAnalyzer(mcp)
         
\ No newline at end of file
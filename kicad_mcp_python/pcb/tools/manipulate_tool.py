@@ -1,14 +1,18 @@
+import functools
+
 from typing import Dict
 
-from ..pcbmodule import PCBTool
+from ..pcbmodule import PCBTool, invalidate_board, get_item_index
 from ...core.ActionFlowManager import ActionFlowManager
+from ...core.mcp_manager import batch_tool_registration
 from ...utils.convert_proto import (
     BOARDITEM_TYPE_CONFIGS, 
+    BOARDITEM_TYPES,
     get_proto_class,
     get_wrapper_class,
-    get_object_type
 )
 
+from kipy.errors import ApiError, ApiStatusCode
 from kipy.geometry import Vector2, Angle
 from kipy.proto.common.types import KIID
 from google.protobuf import message_factory
@@ -17,71 +21,150 @@ from google.protobuf.descriptor import FieldDescriptor
 from mcp.server.fastmcp import FastMCP
 
 
-def convert_to_object(descriptor, args):
-    wrapper = message_factory.GetMessageClass(descriptor)
-    wrapper = wrapper()
+_TYPE_MESSAGE = FieldDescriptor.TYPE_MESSAGE
+_TYPE_ENUM = FieldDescriptor.TYPE_ENUM
+_LABEL_OPTIONAL = FieldDescriptor.LABEL_OPTIONAL
+_LABEL_REQUIRED = FieldDescriptor.LABEL_REQUIRED
+_LABEL_REPEATED = FieldDescriptor.LABEL_REPEATED
+
+
+@functools.cache
+def _get_msg_class(descriptor):
+    return message_factory.GetMessageClass(descriptor)
+
+
+def _set_scalar(wrapper, field_name, value, stack):
+    setattr(wrapper, field_name, value)
+
+
+def _extend_repeated(wrapper, field_name, value, stack):
+    getattr(wrapper, field_name).extend(value)
+
+
+def _fill_message(message_type, wrapper, field_name, value, stack):
+    # For single message fields, filled in place once popped from the stack
+    nested_obj = getattr(wrapper, field_name)
+    nested_obj.SetInParent()
+    stack.append((nested_obj, message_type, value))
+
+
+def _fill_repeated_message(message_type, wrapper, field_name, value, stack):
+    # For repeated fields
+    repeated_field = getattr(wrapper, field_name)
+    for item in value:
+        stack.append((repeated_field.add(), message_type, item))
+
+
+# Handlers keyed by (field.type, field.label); anything else is set directly.
+# Message handlers are bound to the field's message type when the plan is built.
+_FIELD_HANDLERS = {
+    (_TYPE_MESSAGE, _LABEL_OPTIONAL): _fill_message,
+    (_TYPE_MESSAGE, _LABEL_REQUIRED): _fill_message,
+    (_TYPE_MESSAGE, _LABEL_REPEATED): _fill_repeated_message,
+    (_TYPE_ENUM, _LABEL_REPEATED): _extend_repeated,
+}
+
+
+@functools.cache
+def _plan(descriptor):
+    """(field_name, handler) pairs of a message descriptor, built once per descriptor."""
+    plan = []
     for field in descriptor.fields:
-        if field.name in args:
-            if field.type == FieldDescriptor.TYPE_MESSAGE:  
-                if field.label == FieldDescriptor.LABEL_REPEATED:
-                    # For repeated fields
-                    repeated_field = getattr(wrapper, field.name)
-                    for item in args[field.name]:
-                        nested_obj = convert_to_object(field.message_type, item)
-                        repeated_field.append(nested_obj)
-                else:
-                    # For single message fields
-                    nested_obj = convert_to_object(
-                        field.message_type, 
-                        args[field.name]
-                    )
-                    getattr(wrapper, field.name).CopyFrom(nested_obj)
-
-            else:
-                if field.type == FieldDescriptor.TYPE_ENUM:
-                    if field.label == FieldDescriptor.LABEL_REPEATED:
-                        getattr(
-                            wrapper, 
-                            field.name, 
-                        ).extend(args[field.name])
-                    else:
-                        setattr(
-                        wrapper, 
-                        field.name, 
-                        args[field.name]
-                    )
-                    
-                else:
-                    setattr(
-                        wrapper, 
-                        field.name, 
-                        args[field.name]
-                    )
+        field_type = field.type
+        handler = _FIELD_HANDLERS.get((field_type, field.label), _set_scalar)
+        if field_type == _TYPE_MESSAGE:
+            handler = functools.partial(handler, field.message_type)
+        plan.append((field.name, handler))
+    return tuple(plan)
+
+
+def convert_to_object(descriptor, args):
+    wrapper = _get_msg_class(descriptor)()
+    # Nested messages are pushed as (message, descriptor, args) and filled in place
+    # instead of being built recursively and copied into their parent.
+    stack = [(wrapper, descriptor, args)]
+    while stack:
+        message, message_descriptor, message_args = stack.pop()
+        get_arg = message_args.get
+        for field_name, handler in _plan(message_descriptor):
+            value = get_arg(field_name)
+            if value is not None:
+                handler(message, field_name, value, stack)
 
     return wrapper
 
 
+def _move_track(target_item, args):
+    # For 'Track', we need to handle start and end positions
+    start = args.get('start')
+    end = args.get('end')
+    
+    if start is not None:
+        x_start, y_start = start
+        target_item.start += Vector2.from_xy(x_start, y_start)
+    
+    if end is not None:
+        x_end, y_end = end
+        target_item.end += Vector2.from_xy(x_end, y_end)
+
+
+def _move_default(target_item, args):
+    xy_nm = args.get('xy_nm')
+    angle = args.get('angle')
+    
+    # Update the item's position and orientation
+    if xy_nm is not None:
+        x_nm, y_nm = xy_nm
+        target_item.position += Vector2.from_xy(x_nm, y_nm)
+
+    if angle is not None:
+        target_item.orientation += Angle.from_degrees(angle)
+
+
+# Move handlers keyed by the exact wrapper class; other items move by position/orientation.
+_MOVE_HANDLERS = {
+    get_wrapper_class('Track'): _move_track,
+}
+
+
 def get_item_list_config(board, item_type: str):
     '''
     Retrieves the list of items of the specified type from the board.
     '''
     result = {}
     result['args'] = BOARDITEM_TYPE_CONFIGS[item_type]
-    result['item_list'] = {
-        item.id.value:item for item in board.get_items(
-        get_object_type(item_type)
-        )}
+    result['item_list'] = get_item_index(board, item_type)
     return result
 
 
+# None until probed, then whether board.get_items_by_id can be used.
+_items_by_id_supported = None
+
+
 def get_items_by_id(board, item_type, id):
     '''
+    Fetches the item fresh from KiCad, since the caller sends it back with update_items
+    and it may have been changed in the KiCad GUI since it was listed.
+    The item is requested directly with board.get_items_by_id where possible.
     In KiCad version 9.0.4 and below, get_items_by_id does not exist,
     so we use get_items to search for items.
     https://gitlab.com/kicad/code/kicad/-/merge_requests/2256
     '''
-    item_dict = {item.id.value:item for item in board.get_items(get_object_type(item_type))}
-    return item_dict.get(id)
+    global _items_by_id_supported
+    if _items_by_id_supported is None:
+        _items_by_id_supported = hasattr(board, 'get_items_by_id')
+    if _items_by_id_supported:
+        try:
+            items = board.get_items_by_id([KIID(value=id)])
+            return items[0] if items else None
+        except ApiError as e:
+            # Only AS_UNHANDLED means the running KiCad doesn't handle GetItemsById yet;
+            # anything else (an unknown id, a stale board) is a real failure of this call.
+            if e.code != ApiStatusCode.AS_UNHANDLED:
+                raise
+            _items_by_id_supported = False
+
+    return get_item_index(board, item_type).get(id)
 
             
 class CreateItemFlowManager(ActionFlowManager, PCBTool):
@@ -93,8 +176,8 @@ class CreateItemFlowManager(ActionFlowManager, PCBTool):
         self._register_tool()
 
     def _register_tool(self):
-        self.action_setter(self.create_item_step_1)
-        self.action_setter(self.create_item_step_2)
+        self.action_setter(self.create_item_step_1, requires_board=False)
+        self.action_setter(self.create_item_step_2, requires_board=False)
         self.action_setter(self.create_item_step_3)
         
     # TODO: 
@@ -114,7 +197,7 @@ class CreateItemFlowManager(ActionFlowManager, PCBTool):
             create_item_step_2
         """
 
-        return BOARDITEM_TYPE_CONFIGS.keys()
+        return BOARDITEM_TYPES
     
         
     def create_item_step_2(
@@ -166,6 +249,7 @@ class CreateItemFlowManager(ActionFlowManager, PCBTool):
         
         # Create the item using the KiCad API
         item_id = self.board.create_items(kipy_wrapper(new_class))
+        invalidate_board()
         return item_id
     
     
@@ -180,7 +264,7 @@ class EditItemFlowManager(ActionFlowManager, PCBTool):
 
 
     def _register_tool(self):
-        self.action_setter(self.edit_item_step_1)
+        self.action_setter(self.edit_item_step_1, requires_board=False)
         self.action_setter(self.edit_item_step_2)
         self.action_setter(self.edit_item_step_3)
     
@@ -198,7 +282,7 @@ class EditItemFlowManager(ActionFlowManager, PCBTool):
         Next action:
             edit_item_step_2
         """
-        item_types = BOARDITEM_TYPE_CONFIGS.keys()
+        item_types = BOARDITEM_TYPES
         return item_types
     
     
@@ -243,16 +327,12 @@ class EditItemFlowManager(ActionFlowManager, PCBTool):
         """
         
         
-        id = KIID()
-        id.value = item_id
-        # target_item_proto = self.board.get_items_by_id([id])[0].proto # version 9.0.4
-        
         # Get the item protocol wrapper
         target_item_proto = get_items_by_id(
             board=self.board, 
             item_type=self.item_type_cache, 
             id=item_id
-            ).proto  # version 9.0.0
+            ).proto
         
         
         # Get the protocol class for the item type
@@ -266,6 +346,7 @@ class EditItemFlowManager(ActionFlowManager, PCBTool):
         # Create a new item protocol wrapper
         return_wrapper = get_wrapper_class(target_item_proto.DESCRIPTOR.name)(target_item_proto)
         edit_item = self.board.update_items(return_wrapper)
+        invalidate_board()
         return edit_item
         
         
@@ -279,7 +360,7 @@ class MoveItemFlowManager(ActionFlowManager, PCBTool):
 
 
     def _register_tool(self):
-        self.action_setter(self.move_item_step_1)
+        self.action_setter(self.move_item_step_1, requires_board=False)
         self.action_setter(self.move_item_step_2)
         self.action_setter(self.move_item_step_3)
     
@@ -297,7 +378,7 @@ class MoveItemFlowManager(ActionFlowManager, PCBTool):
             move_item_step_2
         """
         
-        item_types = BOARDITEM_TYPE_CONFIGS.keys()
+        item_types = BOARDITEM_TYPES
         return item_types
     
     
@@ -318,10 +399,7 @@ class MoveItemFlowManager(ActionFlowManager, PCBTool):
         """
         self.item_type_cache = item_type # version 9.0.0
         
-        result = {
-        item.id.value:item for item in self.board.get_items(
-        get_object_type(item_type)
-        )}
+        result = get_item_index(self.board, item_type)
         return result
 
 
@@ -348,49 +426,20 @@ class MoveItemFlowManager(ActionFlowManager, PCBTool):
             get_board_status
         """
         
-        # will be added in version 9.0.4
-        
-        # id = KIID()
-        # id.value = item_id
-        
-        # target_item = self.board.get_items_by_id([id])[0] 
-        
         target_item = get_items_by_id(
             board=self.board, 
             item_type=self.item_type_cache, 
             id=item_id
-            )  # version 9.0.0
+            )
         
-        if isinstance(target_item, get_wrapper_class('Track')):
-            # For 'Track', we need to handle start and end positions
-            start = args.get('start')
-            end = args.get('end')
-            
-            if start is not None:
-                x_start, y_start = start
-                target_item.start += Vector2.from_xy(x_start, y_start)
-            
-            if end is not None:
-                x_end, y_end = end
-                target_item.end += Vector2.from_xy(x_end, y_end)
-        else:
-            xy_nm = args.get('xy_nm')
-            angle = args.get('angle')
-            
-            # Update the item's position and orientation
-            if xy_nm is not None:
-                x_nm, y_nm = xy_nm
-                target_item.position += Vector2.from_xy(x_nm, y_nm)
-        
-            if angle is not None:
-                target_item.orientation += Angle.from_degrees(angle)
-
+        _MOVE_HANDLERS.get(type(target_item), _move_default)(target_item, args)
         move_item = self.board.update_items(target_item)
+        invalidate_board()
         return move_item
         
         
         
-class RemoveItemFlowManager(ActionFlowManager):
+class RemoveItemFlowManager(ActionFlowManager, PCBTool):
     """A class that manages the step-by-step flow of remove Item"""
     
     def __init__(self, mcp: FastMCP):
@@ -412,13 +461,10 @@ class RemoveItemFlowManager(ActionFlowManager):
         Next action:
             get_board_status
         """
-        kiid_ids = []
-        for item_id in item_ids:
-            kiid = KIID()
-            kiid.value = item_id
-            kiid_ids.append(kiid)
+        kiid_ids = [KIID(value=item_id) for item_id in item_ids]
         
         response = self.board.remove_items_by_id(kiid_ids)
+        invalidate_board()
         return response
     
     
@@ -436,8 +482,9 @@ class ManipulationTools:
             mcp (FastMCP): The MCP instance to register the tools with.
         '''
         # Register flow managers
-        CreateItemFlowManager(mcp)
-        EditItemFlowManager(mcp)
-        MoveItemFlowManager(mcp)
-        RemoveItemFlowManager(mcp)
+        with batch_tool_registration(mcp):
+            CreateItemFlowManager(mcp)
+            EditItemFlowManager(mcp)
+            MoveItemFlowManager(mcp)
+            RemoveItemFlowManager(mcp)
         
\ No newline at end of file
@@ -0,0 +1,73 @@
+import anyio
+
+from mcp.server.fastmcp import FastMCP
+
+from kicad_mcp_python.core.ActionFlowManager import ActionFlowManager
+
+
+class ExampleFlowManager(ActionFlowManager):
+
+    def __init__(self, mcp: FastMCP):
+        super().__init__(mcp)
+        self.action_setter(self.example_step_1, requires_board=False)
+        self.action_setter(self.example_step_2, requires_board=False)
+        self.action_setter(self.example_step_3, requires_board=False)
+
+    def example_step_1(self):
+        """Returns the first step's result."""
+        return 1
+
+    def example_step_2(self, value: int):
+        """Returns the given value."""
+        return value
+
+    def example_step_3(self):
+        """Fails."""
+        raise ValueError("step 3 failed")
+
+
+def _run_tool(mcp, name, **kwargs):
+    tool = mcp._tool_manager._tools[name]
+    return anyio.run(lambda: tool.fn(**kwargs))
+
+
+def test_next_action_follows_each_step():
+    mcp = FastMCP("test")
+    ExampleFlowManager(mcp)
+
+    assert _run_tool(mcp, 'example_step_1') == {
+        "result": 1,
+        "status": "success",
+        "next_action": "example_step_2",
+        "next_action_info": "Next execution: example_step_2",
+    }
+    assert _run_tool(mcp, 'example_step_2', value=5) == {
+        "result": 5,
+        "status": "success",
+        "next_action": "example_step_3",
+        "next_action_info": "Next execution: example_step_3",
+    }
+
+
+def test_last_step_completes_flow():
+    mcp = FastMCP("test")
+    manager = ExampleFlowManager(mcp)
+
+    assert manager.get_next_action('example_step_3') is None
+    assert manager.response_formatter(None, action='example_step_3') == {
+        "result": None,
+        "status": "success",
+        "next_action": None,
+        "next_action_info": "Flow complete",
+    }
+
+
+def test_errors_are_formatted():
+    mcp = FastMCP("test")
+    ExampleFlowManager(mcp)
+
+    assert _run_tool(mcp, 'example_step_3') == {
+        "result": "step 3 failed",
+        "status": "error",
+        "error_type": "ValueError",
+    }
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from mcp.server.fastmcp import FastMCP
+from kipy.errors import ApiError
+
+from kicad_mcp_python.pcb.tools.analyze_tool import BoardAnalyzer
+from kicad_mcp_python.utils.convert_proto import get_object_type, get_proto_class
+
+
+def _item(item_type):
+    return SimpleNamespace(proto=get_proto_class(item_type)())
+
+
+class FakeBoard:
+    '''Serves Track and Via; like KiCad, a batched request skips other types.'''
+
+    served = {get_object_type('Track'), get_object_type('Via')}
+
+    def __init__(self, items):
+        self.items = items
+
+    def get_items(self, types):
+        if not isinstance(types, list):
+            types = [types]
+        served = [object_type for object_type in types if object_type in self.served]
+        if not served:
+            raise ApiError('unhandled item type')
+        return [item for item_type, item in self.items if get_object_type(item_type) in served]
+
+
+@pytest.fixture
+def analyzer():
+    return BoardAnalyzer(FastMCP('test'))
+
+
+def test_unsupported_types_keep_their_error(analyzer):
+    analyzer.board = FakeBoard([('Track', _item('Track')), ('Track', _item('Track'))])
+    result = analyzer._get_board_items()
+
+    assert len(result['Track']) == 2
+    # Served but empty.
+    assert result['Via'] == []
+    # Skipped by the batched request, reported as before.
+    assert result['Field'].startswith('Not yet implemented')
+    assert result['Zone'].startswith('Not yet implemented')
+
+
+def test_unreachable_board_raises(analyzer):
+    analyzer.board = FakeBoard([])
+    analyzer.board.served = set()
+    with pytest.raises(ApiError):
+        analyzer._get_board_items()
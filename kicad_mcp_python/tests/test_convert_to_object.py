@@ -0,0 +1,135 @@
+import pytest
+
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+from google.protobuf.descriptor import FieldDescriptor
+
+from kicad_mcp_python.pcb.tools.manipulate_tool import convert_to_object
+from kicad_mcp_python.utils.convert_proto import get_proto_class
+
+
+def recursive_convert_to_object(descriptor, args):
+    '''The original recursive builder, kept as the reference for convert_to_object.'''
+    wrapper = message_factory.GetMessageClass(descriptor)()
+    for field in descriptor.fields:
+        if field.name in args:
+            if field.type == FieldDescriptor.TYPE_MESSAGE:
+                if field.label == FieldDescriptor.LABEL_REPEATED:
+                    repeated_field = getattr(wrapper, field.name)
+                    for item in args[field.name]:
+                        repeated_field.append(recursive_convert_to_object(field.message_type, item))
+                else:
+                    nested_obj = recursive_convert_to_object(field.message_type, args[field.name])
+                    getattr(wrapper, field.name).CopyFrom(nested_obj)
+            elif field.type == FieldDescriptor.TYPE_ENUM and field.label == FieldDescriptor.LABEL_REPEATED:
+                getattr(wrapper, field.name).extend(args[field.name])
+            else:
+                setattr(wrapper, field.name, args[field.name])
+    return wrapper
+
+
+def _build_shape_descriptor():
+    '''
+    A standalone message covering every branch of convert_to_object:
+    scalars, a single enum, a repeated enum, single and repeated nested messages,
+    and a message nested two levels deep.
+    '''
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name='convert_to_object_test.proto',
+        package='convert_to_object_test',
+        syntax='proto3',
+    )
+    color = file_proto.enum_type.add(name='Color')
+    for number, name in enumerate(('C_UNKNOWN', 'C_RED', 'C_GREEN')):
+        color.value.add(name=name, number=number)
+
+    point = file_proto.message_type.add(name='Point')
+    point.field.add(name='x', number=1, type=FieldDescriptor.TYPE_INT64, label=FieldDescriptor.LABEL_OPTIONAL)
+    point.field.add(name='y', number=2, type=FieldDescriptor.TYPE_INT64, label=FieldDescriptor.LABEL_OPTIONAL)
+
+    segment = file_proto.message_type.add(name='Segment')
+    segment.field.add(name='start', number=1, type=FieldDescriptor.TYPE_MESSAGE,
+                      label=FieldDescriptor.LABEL_OPTIONAL, type_name='.convert_to_object_test.Point')
+    segment.field.add(name='end', number=2, type=FieldDescriptor.TYPE_MESSAGE,
+                      label=FieldDescriptor.LABEL_OPTIONAL, type_name='.convert_to_object_test.Point')
+
+    shape = file_proto.message_type.add(name='Shape')
+    shape.field.add(name='name', number=1, type=FieldDescriptor.TYPE_STRING, label=FieldDescriptor.LABEL_OPTIONAL)
+    shape.field.add(name='locked', number=2, type=FieldDescriptor.TYPE_BOOL, label=FieldDescriptor.LABEL_OPTIONAL)
+    shape.field.add(name='scale', number=3, type=FieldDescriptor.TYPE_DOUBLE, label=FieldDescriptor.LABEL_OPTIONAL)
+    shape.field.add(name='color', number=4, type=FieldDescriptor.TYPE_ENUM,
+                    label=FieldDescriptor.LABEL_OPTIONAL, type_name='.convert_to_object_test.Color')
+    shape.field.add(name='colors', number=5, type=FieldDescriptor.TYPE_ENUM,
+                    label=FieldDescriptor.LABEL_REPEATED, type_name='.convert_to_object_test.Color')
+    shape.field.add(name='origin', number=6, type=FieldDescriptor.TYPE_MESSAGE,
+                    label=FieldDescriptor.LABEL_OPTIONAL, type_name='.convert_to_object_test.Point')
+    shape.field.add(name='points', number=7, type=FieldDescriptor.TYPE_MESSAGE,
+                    label=FieldDescriptor.LABEL_REPEATED, type_name='.convert_to_object_test.Point')
+    shape.field.add(name='segment', number=8, type=FieldDescriptor.TYPE_MESSAGE,
+                    label=FieldDescriptor.LABEL_OPTIONAL, type_name='.convert_to_object_test.Segment')
+    shape.field.add(name='segments', number=9, type=FieldDescriptor.TYPE_MESSAGE,
+                    label=FieldDescriptor.LABEL_REPEATED, type_name='.convert_to_object_test.Segment')
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+    return pool.FindMessageTypeByName('convert_to_object_test.Shape')
+
+
+SHAPE_DESCRIPTOR = _build_shape_descriptor()
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'name': 'outline', 'locked': True, 'scale': 1.5, 'color': 2},
+    # An empty nested dict still marks its field as present.
+    {'origin': {}},
+    {'origin': {'x': 10, 'y': -20}},
+    {'segment': {'start': {}, 'end': {'x': 3}}},
+    {'points': [{'x': 1, 'y': 2}, {}, {'y': 4}]},
+    {'segments': [{'start': {'x': 1}}, {'end': {}}, {}]},
+    {'colors': [1, 2, 1]},
+    {'colors': []},
+    {
+        'name': 'all',
+        'color': 1,
+        'colors': [2, 0],
+        'origin': {'x': 5},
+        'points': [{'x': 1}, {'x': 2, 'y': 3}],
+        'segment': {'start': {'x': 1, 'y': 1}, 'end': {}},
+        'segments': [{'start': {}, 'end': {'y': 7}}],
+        'unknown_key': 'ignored',
+    },
+])
+def test_matches_recursive_builder(args):
+    expected = recursive_convert_to_object(SHAPE_DESCRIPTOR, args)
+    result = convert_to_object(SHAPE_DESCRIPTOR, args)
+    assert result == expected
+    assert result.SerializeToString(deterministic=True) == expected.SerializeToString(deterministic=True)
+
+
+def test_empty_nested_dict_sets_presence():
+    result = convert_to_object(SHAPE_DESCRIPTOR, {'origin': {}, 'segment': {'end': {}}})
+    assert result.HasField('origin')
+    assert result.HasField('segment')
+    assert result.segment.HasField('end')
+    assert not result.segment.HasField('start')
+
+
+@pytest.mark.parametrize('item_type, args', [
+    ('Via', {'position': {'x_nm': 1000000, 'y_nm': 2000000}, 'locked': 1}),
+    ('Track', {
+        'start': {'x_nm': 0, 'y_nm': 0},
+        'end': {'x_nm': 1000000, 'y_nm': 0},
+        'width': {'value_nm': 250000},
+        'layer': 3,
+        'net': {'name': 'GND'},
+    }),
+    ('Zone', {'name': 'GND', 'layers': [3, 34], 'priority': 1, 'filled_polygons': [{}, {'layer': 3}]}),
+    ('BoardText', {'text': {'position': {'x_nm': 5, 'y_nm': 5}, 'text': 'REV A'}, 'layer': 3}),
+    ('Net', {'name': 'VCC', 'code': {}}),
+    ('FootprintInstance', {'position': {}, 'orientation': {'value_degrees': 90.0}, 'layer': 3}),
+])
+def test_matches_recursive_builder_for_board_items(item_type, args):
+    descriptor = get_proto_class(item_type).DESCRIPTOR
+    expected = recursive_convert_to_object(descriptor, args)
+    result = convert_to_object(descriptor, args)
+    assert result.SerializeToString(deterministic=True) == expected.SerializeToString(deterministic=True)
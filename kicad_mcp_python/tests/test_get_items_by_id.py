@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from kipy.errors import ApiError, ApiStatusCode
+
+from kicad_mcp_python.pcb.tools import manipulate_tool
+
+
+def _item(item_id):
+    return SimpleNamespace(id=SimpleNamespace(value=item_id))
+
+
+class FakeBoard:
+
+    def __init__(self, items, by_id_error=None):
+        self.items = items
+        self.by_id_error = by_id_error
+        self.get_items_calls = 0
+
+    def get_items(self, object_type):
+        self.get_items_calls += 1
+        return self.items
+
+    def get_items_by_id(self, kiids):
+        if self.by_id_error is not None:
+            raise self.by_id_error
+        wanted = {kiid.value for kiid in kiids}
+        return [item for item in self.items if item.id.value in wanted]
+
+
+@pytest.fixture(autouse=True)
+def reset_probe(monkeypatch):
+    monkeypatch.setattr(manipulate_tool, '_items_by_id_supported', None)
+
+
+def test_fast_path():
+    board = FakeBoard([_item('a'), _item('b')])
+    assert manipulate_tool.get_items_by_id(board, 'Via', 'b').id.value == 'b'
+    assert board.get_items_calls == 0
+
+
+def test_unhandled_falls_back_for_good():
+    board = FakeBoard(
+        [_item('a')],
+        by_id_error=ApiError('unhandled', code=ApiStatusCode.AS_UNHANDLED),
+    )
+    assert manipulate_tool.get_items_by_id(board, 'Via', 'a').id.value == 'a'
+    assert manipulate_tool._items_by_id_supported is False
+    assert board.get_items_calls == 1
+
+
+def test_other_api_errors_keep_fast_path():
+    board = FakeBoard(
+        [_item('a')],
+        by_id_error=ApiError('no such item', code=ApiStatusCode.AS_BAD_REQUEST),
+    )
+    with pytest.raises(ApiError):
+        manipulate_tool.get_items_by_id(board, 'Via', 'missing')
+    assert manipulate_tool._items_by_id_supported is True
+    assert board.get_items_calls == 0
+
+    board.by_id_error = None
+    assert manipulate_tool.get_items_by_id(board, 'Via', 'a').id.value == 'a'
+    assert board.get_items_calls == 0
@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+from kicad_mcp_python.utils import preview_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    directory = tmp_path / 'previews'
+    monkeypatch.setenv('KICAD_MCP_CACHE_DIR', str(directory))
+    return directory
+
+
+@pytest.fixture
+def board_file(tmp_path):
+    path = tmp_path / 'board.kicad_pcb'
+    path.write_bytes(b'(kicad_pcb (version 20240108))')
+    return path
+
+
+def _set_mtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def test_cache_dir_uses_override(cache_dir):
+    assert preview_cache.cache_dir() == cache_dir
+
+
+def test_get_miss(cache_dir):
+    assert preview_cache.get('missing') is None
+
+
+def test_put_then_get(cache_dir):
+    assert preview_cache.put('key', b'jpeg data')
+    assert preview_cache.get('key') == b'jpeg data'
+    assert preview_cache.path_for('key') == cache_dir / 'key.jpg'
+    # Nothing is left behind under the temporary name.
+    assert [path.name for path in cache_dir.iterdir()] == ['key.jpg']
+
+
+def test_get_refreshes_mtime(cache_dir):
+    preview_cache.put('key', b'jpeg data')
+    path = preview_cache.path_for('key')
+    _set_mtime(path, 1_000_000)
+
+    preview_cache.get('key')
+    assert path.stat().st_mtime > 1_000_000
+
+
+def test_put_returns_false_when_write_fails(cache_dir):
+    # A file where the cache directory should be makes every write fail.
+    cache_dir.write_bytes(b'')
+    assert preview_cache.put('key', b'jpeg data') is False
+    assert preview_cache.get('key') is None
+
+
+def test_prune_evicts_oldest(cache_dir):
+    for mtime, key in enumerate(('oldest', 'older', 'newest'), start=1):
+        preview_cache.put(key, b'x' * 10)
+        _set_mtime(preview_cache.path_for(key), mtime * 1_000_000)
+
+    preview_cache.prune(max_bytes=20)
+    assert sorted(path.name for path in cache_dir.iterdir()) == ['newest.jpg', 'older.jpg']
+
+    preview_cache.prune(max_bytes=10)
+    assert [path.name for path in cache_dir.iterdir()] == ['newest.jpg']
+
+
+def test_prune_keeps_recently_read_entries(cache_dir):
+    for mtime, key in enumerate(('first', 'second'), start=1):
+        preview_cache.put(key, b'x' * 10)
+        _set_mtime(preview_cache.path_for(key), mtime * 1_000_000)
+
+    preview_cache.get('first')
+    preview_cache.prune(max_bytes=10)
+    assert [path.name for path in cache_dir.iterdir()] == ['first.jpg']
+
+
+def test_prune_ignores_other_files(cache_dir):
+    preview_cache.put('key', b'x' * 10)
+    (cache_dir / 'notes.txt').write_bytes(b'y' * 100)
+
+    preview_cache.prune(max_bytes=10)
+    assert sorted(path.name for path in cache_dir.iterdir()) == ['key.jpg', 'notes.txt']
+
+
+def test_put_temporary_is_pruned_like_other_entries(cache_dir):
+    path = preview_cache.put_temporary(b'jpeg data')
+    assert path.parent == cache_dir
+    assert path.read_bytes() == b'jpeg data'
+
+    preview_cache.prune(max_bytes=0)
+    assert not path.exists()
+
+
+def test_preview_key_is_stable(board_file, tmp_path):
+    copy = tmp_path / 'copy.kicad_pcb'
+    copy.write_bytes(board_file.read_bytes())
+
+    assert preview_cache.preview_key(board_file) == preview_cache.preview_key(board_file)
+    # Identical boards share an entry wherever they are saved.
+    assert preview_cache.preview_key(board_file) == preview_cache.preview_key(copy)
+
+
+def test_preview_key_changes_with_layers(board_file):
+    default_key = preview_cache.preview_key(board_file)
+    front_key = preview_cache.preview_key(board_file, ['F.Cu', 'F.SilkS'])
+
+    assert front_key != default_key
+    # Layer order sets the drawing order, so it is part of the key.
+    assert preview_cache.preview_key(board_file, ['F.SilkS', 'F.Cu']) != front_key
+
+
+def test_preview_key_changes_with_contents(board_file):
+    key = preview_cache.preview_key(board_file)
+    board_file.write_bytes(board_file.read_bytes() + b'\n')
+
+    assert preview_cache.preview_key(board_file) != key
+
+
+def test_preview_key_changes_with_renderer(board_file):
+    key = preview_cache.preview_key(board_file, renderer='/usr/bin/kicad-cli:1:100')
+
+    assert preview_cache.preview_key(board_file, renderer='/usr/bin/kicad-cli:1:100') == key
+    # A new kicad-cli build, or another install, doesn't reuse the old previews.
+    assert preview_cache.preview_key(board_file, renderer='/usr/bin/kicad-cli:2:120') != key
+    assert preview_cache.preview_key(board_file, renderer='/opt/kicad/bin/kicad-cli:1:100') != key
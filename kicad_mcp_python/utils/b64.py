@@ -0,0 +1,9 @@
+try:
+    # SIMD base64 encoder, installed with the "speedups" extra.
+    # b64encode_as_string builds the str directly, without an intermediate bytes copy.
+    from pybase64 import b64encode_as_string
+except ImportError:
+    import base64
+
+    def b64encode_as_string(data):
+        return base64.b64encode(data).decode('ascii')
@@ -1,3 +1,5 @@
+import functools
+
 from google.protobuf.descriptor import FieldDescriptor
 
 from kipy.proto.common.types import KiCadObjectType
@@ -123,14 +125,17 @@ KICAD_TYPE_MAPPING = {
     # },
 }
 
+@functools.cache
 def get_proto_class(type_name):
     """Return proto class by string type name"""
     return KICAD_TYPE_MAPPING[type_name]['proto_class']
 
+@functools.cache
 def get_wrapper_class(type_name):
     """Return wrapper class by string type name"""
     return KICAD_TYPE_MAPPING[type_name]['wrapper_class']
 
+@functools.cache
 def get_object_type(type_name):
     """Return KiCad object type by string type name"""
     return KICAD_TYPE_MAPPING[type_name]['object_type']
@@ -194,6 +199,9 @@ def convert_proto_to_dict():
 
 BOARDITEM_TYPE_CONFIGS = convert_proto_to_dict()
 
+# Item type names as an immutable tuple, returned by the entrance steps of each flow.
+BOARDITEM_TYPES = tuple(BOARDITEM_TYPE_CONFIGS)
+
 # Define the required arguments for each item type.
 
 BOARDITEM_TYPE_CONFIGS['Arc']['required_args']                  = ['start', 'end', 'center', 'angle']
@@ -1,101 +1,258 @@
+import asyncio
+import contextlib
+import functools
+import logging
+import multiprocessing
 import os
+import sys
 import subprocess
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
 import tempfile
-from PIL import Image
-import cairosvg
+import threading
+from PIL import Image, features
+from cairosvg.parser import Tree
+from cairosvg.surface import PNGSurface
 import io
 from dotenv import load_dotenv
-import base64
 from pathlib import Path
 
-# Load .env file
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Encoder settings, pinned so previews don't change with Pillow's defaults.
+# optimize and progressive would each add extra passes over the coefficients.
+JPEG_SAVE_OPTIONS = {
+    'quality': 75,
+    'subsampling': '4:2:0',
+    'optimize': False,
+    'progressive': False,
+}
+
+@functools.cache
+def load_env():
+    """
+    Loads the .env file into the environment, once per process.
+    Called when the first converter is created rather than at import time.
+    """
+    load_dotenv()
+
+
+@functools.cache
+def _warn_without_libjpeg_turbo():
+    """Warns once if Pillow's JPEG encoder isn't libjpeg-turbo, which is several times faster."""
+    if not features.check_feature('libjpeg_turbo'):
+        logger.warning("Pillow is not built with libjpeg-turbo; board previews will encode slowly.")
+
+
+@functools.cache
+def find_kicad_cli():
+    """
+    Returns the kicad-cli path from KICAD_CLI_PATH, checked once per process.
+    Failed lookups raise and are not cached, so fixing the setting takes effect on the next call.
+    """
+    load_env()
+    kicad_cli_path = os.getenv('KICAD_CLI_PATH')
+    if not kicad_cli_path:
+        raise ValueError("KICAD_CLI_PATH is not set in the .env file.")
+    
+    if not os.path.exists(kicad_cli_path):
+        raise FileNotFoundError(f"KiCad CLI not found: {kicad_cli_path}")
+    return kicad_cli_path
+
+
+def _init_render_worker():
+    """
+    Process pool initializer. The server's stdout is the stdio JSON-RPC stream,
+    so anything a worker writes there goes to stderr instead.
+    """
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+
+def _render_jpg_bytes(boardname, layers):
+    """Process pool entry point; each worker renders with its own converter."""
+    return KiCadPCBConverter.instance().pcb_to_jpg_bytes(boardname, layers=layers)
 
 
 class KiCadPCBConverter:
+    _instance = None
+    _instance_lock = threading.Lock()
+
     def __init__(self):
-        self.kicad_cli_path = os.getenv('KICAD_CLI_PATH')
-        if not self.kicad_cli_path:
-            raise ValueError("KICAD_CLI_PATH is not set in the .env file.")
-        
-        if not os.path.exists(self.kicad_cli_path):
-            raise FileNotFoundError(f"KiCad CLI not found: {self.kicad_cli_path}")
+        self.kicad_cli_path = find_kicad_cli()
     
-    def pcb_to_jpg_via_svg(self, boardname, layers=None, cleanup=True):
-        """Convert PCB to JPG via SVG and return temporary file path
-        Return:
-            dict: Base64 encoded data and metadata of the converted image
+    @classmethod
+    def instance(cls):
+        """Returns the converter shared by the whole process, creating it on first use."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
+    def cli_identity(self):
         """
-        # Default layer settings (front and back)
-        if layers is None:
-            layers = ["F.Cu", "B.Cu", "F.SilkS", "B.SilkS", "F.Mask", "B.Mask"]
-        try:
-            pcb_path = self.get_pcb_path_by_name(boardname)
-        except Exception as e:
-            raise RuntimeError(f"Error occurred while finding board file, please write correct path in .env: {e}")
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.svg', delete=False) as svg_temp:
-            svg_path = svg_temp.name
-        
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as jpg_temp:
-            jpg_path = jpg_temp.name
-        
-        jpg_path_2 = 'test.jpg'            
+        Returns a string identifying the kicad-cli build: its resolved path, mtime and size.
+        It changes when KiCad is upgraded or KICAD_CLI_PATH points at another install.
+        """
+        kicad_cli_path = os.path.realpath(self.kicad_cli_path)
+        stat = os.stat(kicad_cli_path)
+        return f"{kicad_cli_path}:{stat.st_mtime_ns}:{stat.st_size}"
+    
 
-        try:
-            # Convert layers to comma-separated string
-            layers_str = ",".join(layers)
-            
-            # Configure KiCad CLI command
-            cmd = [
-                self.kicad_cli_path, "pcb", "export", "svg",
-                "--output", svg_path,
-                "--layers", layers_str,  # Comma-separated layer list
-                "--mode-single",  # Single file mode
-                pcb_path
-            ]
-            
-            print(f"Executing command: {' '.join(cmd)}")  # For debugging
-            
+    def pcb_to_jpg_bytes(self, boardname, layers=None, cleanup=True):
+        """Convert PCB to JPG via SVG
+        Return:
+            bytes: Raw JPEG data of the converted image
+        """
+        with self._svg_export(boardname, layers, cleanup) as (cmd, svg_path):
             # Generate SVG with KiCad CLI
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
             
             # Convert SVG to JPG
-            png_data = cairosvg.svg2png(url=svg_path)
-            image = Image.open(io.BytesIO(png_data))
-            image.convert('RGB').save(jpg_path, 'JPEG')
-            
-            with open(jpg_path, 'rb') as f:
-                jpg_data = f.read()
-            
-            # Encode to Base64
-            base64_data = base64.b64encode(jpg_data).decode('utf-8')
-            if cleanup:
-                # Delete SVG temporary file
-                os.unlink(svg_path)
-                os.unlink(jpg_path)
-                
-            return base64_data
+            return self.svg_to_jpg(svg_path)
+    
 
+    async def pcb_to_jpg_bytes_async(self, boardname, layers=None, cleanup=True):
+        """Convert PCB to JPG via SVG without blocking the event loop
+        kicad-cli runs as an asyncio subprocess and the rasterization in a worker thread.
+        Return:
+            bytes: Raw JPEG data of the converted image
+        """
+        with self._svg_export(boardname, layers, cleanup) as (cmd, svg_path):
+            # Generate SVG with KiCad CLI
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await proc.communicate()
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    proc.returncode, cmd,
+                    output=stdout.decode(errors='replace'),
+                    stderr=stderr.decode(errors='replace'),
+                )
             
+            # Convert SVG to JPG
+            return await asyncio.to_thread(self.svg_to_jpg, svg_path)
+    
+
+    @contextlib.contextmanager
+    def _svg_export(self, boardname, layers=None, cleanup=True):
+        """
+        Yields the kicad-cli command exporting boardname to a temporary SVG, and the SVG's path.
+        The SVG is deleted afterwards, on success only with cleanup, and failures are raised as RuntimeError.
+        """
+        pcb_path = self._find_pcb_path(boardname)
+        # Create temporary files
+        with tempfile.NamedTemporaryFile(suffix='.svg', delete=False) as svg_temp:
+            svg_path = svg_temp.name
+
+        succeeded = False
+        try:
+            cmd = self._svg_export_command(pcb_path, svg_path, layers)
+            logger.debug(f"Executing command: {' '.join(cmd)}")
+            yield cmd, svg_path
+            succeeded = True
         except subprocess.CalledProcessError as e:
-            # Clean up temporary files on failure
-            if os.path.exists(svg_path):
-                os.unlink(svg_path)
-            if os.path.exists(jpg_path):
-                os.unlink(jpg_path)
-            
-            # Print detailed error information
-            print(f"Standard output: {e.stdout}")
-            print(f"Standard error: {e.stderr}")
+            logger.error(f"kicad-cli failed\nStandard output: {e.stdout}\nStandard error: {e.stderr}")
             raise RuntimeError(f"KiCad CLI execution error: {e}")
         except Exception as e:
-            # Clean up temporary files on failure
-            if os.path.exists(svg_path):
-                os.unlink(svg_path)
-            if os.path.exists(jpg_path):
-                os.unlink(jpg_path)
             raise RuntimeError(f"Conversion error: {e}")
+        finally:
+            # Temporary files are always removed on failure
+            if (cleanup or not succeeded) and os.path.exists(svg_path):
+                os.unlink(svg_path)
+    
+
+    def _find_pcb_path(self, boardname):
+        try:
+            return self.get_pcb_path_by_name(boardname)
+        except Exception as e:
+            raise RuntimeError(f"Error occurred while finding board file, please write correct path in .env: {e}")
+    
+
+    def _svg_export_command(self, pcb_path, svg_path, layers=None):
+        """Builds the kicad-cli command exporting the given layers of pcb_path to svg_path"""
+        # Default layer settings (front and back)
+        if layers is None:
+            layers = ["F.Cu", "B.Cu", "F.SilkS", "B.SilkS", "F.Mask", "B.Mask"]
+        # Convert layers to comma-separated string
+        layers_str = ",".join(layers)
+        
+        # Configure KiCad CLI command
+        return [
+            self.kicad_cli_path, "pcb", "export", "svg",
+            "--output", svg_path,
+            "--layers", layers_str,  # Comma-separated layer list
+            "--mode-single",  # Single file mode
+            # Keep the SVG, and the raster made from it, down to the board itself:
+            # no title block or frame, and a page cropped to the board outline.
+            "--exclude-drawing-sheet",
+            "--page-size-mode", "2",
+            pcb_path
+        ]
+    
+
+    def pcb_to_jpg_many(self, boardnames, layers=None):
+        """Convert several PCBs to JPG, one kicad-cli run and rasterization per process
+        Return:
+            list[bytes]: Raw JPEG data, in the order of boardnames
+        """
+        if len(boardnames) > 1:
+            max_workers = min(len(boardnames), os.cpu_count() or 1)
+            try:
+                # The server is multi-threaded, and a forked worker could inherit a lock
+                # held by another thread (logging, the converter or KiCad locks), so workers are spawned.
+                with ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_render_worker,
+                ) as executor:
+                    return list(executor.map(_render_jpg_bytes, boardnames, [layers] * len(boardnames)))
+            except (BrokenExecutor, OSError) as e:
+                # The pool itself failed (no worker processes or semaphores available,
+                # a worker died); render errors are RuntimeErrors and still propagate.
+                logger.warning(f"Process pool unavailable, rendering boards one at a time: {e}")
+        
+        return [self.pcb_to_jpg_bytes(boardname, layers=layers) for boardname in boardnames]
+    
+
+    @staticmethod
+    def svg_to_jpg(svg_path):
+        """
+        Rasterize an SVG file straight into a cairo image surface and encode it as JPEG in memory.
+        This skips the PNG encode/decode round trip of cairosvg.svg2png and the temporary JPEG file.
+        
+        Return:
+            bytes: JPEG data
+        """
+        # With output=None the surface is only drawn, never written out as PNG.
+        surface = PNGSurface(Tree(url=svg_path), None, 96)
+        cairo_surface = surface.cairo
+        cairo_surface.flush()
+        
+        # cairo stores premultiplied ARGB32 in native byte order, i.e. BGRa on little-endian hosts.
+        # Unpacking that raw mode copies the pixels, so the surface can go right away.
+        image = Image.frombuffer(
+            'RGBA',
+            (cairo_surface.get_width(), cairo_surface.get_height()),
+            cairo_surface.get_data(),
+            'raw',
+            'BGRa',
+            cairo_surface.get_stride(),
+            1,
+        )
+        del surface, cairo_surface
+        
+        # Drop each raster as soon as the next one exists, so the JPEG encoder
+        # only runs alongside the RGB image.
+        image = image.convert('RGB')
+        buffer = io.BytesIO()
+        _warn_without_libjpeg_turbo()
+        image.save(buffer, 'JPEG', **JPEG_SAVE_OPTIONS)
+        del image
+        return buffer.getvalue()
     
 
     def get_pcb_path_by_name(self, boardname):
@@ -112,7 +269,7 @@ class KiCadPCBConverter:
         pcb_paths = os.getenv('PCB_PATHS')
         
         if not pcb_paths:
-            print("PCB_PATHS environment variable is not set.")
+            logger.warning("PCB_PATHS environment variable is not set.")
             return None
         
         # Convert comma-separated paths to list and remove whitespace
@@ -130,5 +287,5 @@ class KiCadPCBConverter:
             if filename == boardname:
                 return path
         
-        print(f"File '{boardname}' not found.")
+        logger.warning(f"File '{boardname}' not found.")
         return None
\ No newline at end of file
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+# Bump when the rendering pipeline changes in a way that alters the image.
+_PREVIEW_FORMAT = b"svg-jpeg-1"
+
+# Total size the cached previews may take up before the oldest are removed.
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def cache_dir():
+    """
+    Returns the directory holding rendered board previews.
+    KICAD_MCP_CACHE_DIR overrides the default of $XDG_CACHE_HOME/kicad-mcp/previews
+    (~/.cache/kicad-mcp/previews when XDG_CACHE_HOME is not set).
+    """
+    override = os.getenv('KICAD_MCP_CACHE_DIR')
+    if override:
+        return Path(override)
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(Path.home(), '.cache')
+    return Path(base) / 'kicad-mcp' / 'previews'
+
+
+def preview_key(pcb_path, layers=None, renderer=''):
+    """
+    Returns the cache key of a preview: a blake2b hash of the board file contents,
+    the render options and the renderer, so identical boards share an entry wherever
+    they are saved. renderer identifies the kicad-cli build (see
+    KiCadPCBConverter.cli_identity), so upgrading KiCad or pointing KICAD_CLI_PATH
+    elsewhere doesn't serve previews made by the old one.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(_PREVIEW_FORMAT)
+    digest.update(b"\0" + renderer.encode() + b"\0")
+    digest.update(b"\0" + ",".join(layers or ()).encode() + b"\0")
+    with open(pcb_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path_for(key):
+    """Returns the file the preview for key is stored in."""
+    return cache_dir() / f"{key}.jpg"
+
+
+def get(key):
+    """
+    Returns the cached JPEG for key, or None.
+    A hit refreshes the entry's mtime, which prune() uses as the last access time.
+    """
+    path = path_for(key)
+    try:
+        data = path.read_bytes()
+        os.utime(path)
+    except OSError:
+        return None
+    return data
+
+
+def put(key, jpg_data):
+    """
+    Stores the JPEG for key and prunes the cache. Returns whether it was stored;
+    failures are otherwise ignored, the cache only ever saves work.
+    """
+    try:
+        _write(jpg_data, path_for(key))
+        prune()
+    except OSError:
+        return False
+    return True
+
+
+def put_temporary(jpg_data):
+    """
+    Stores a JPEG that has no cache key under a unique name and returns its path.
+    The file is pruned like any other entry.
+    """
+    directory = cache_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='preview-', suffix='.jpg', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(jpg_data)
+    prune()
+    return Path(path)
+
+
+def _write(jpg_data, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write under a temporary name first so readers never see a partial file.
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(jpg_data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def prune(max_bytes=MAX_CACHE_BYTES):
+    """
+    Removes the least recently used previews until the cache fits in max_bytes.
+    """
+    entries = []
+    total = 0
+    for entry in os.scandir(cache_dir()):
+        if not entry.name.endswith('.jpg'):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total += stat.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size